@@ -1,62 +1,127 @@
 import argparse
+import io
+import mmap
 import re
 import json
-from typing import List, Dict, Any
+import os
+import shutil
+import stat
+import struct
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
 # --- 1. СПЕЦИФИКАЦИЯ КОМАНД УВМ ---
-# Словарь для маппинга мнемоник на код операции (A), формат и поля.
+# Регулярные выражения для парсинга операндов (компилируются один раз при загрузке модуля).
+# Possessive-квантификаторы (Python 3.11+) не отдают захваченные символы
+# обратно, поэтому на некорректном вводе сопоставление остаётся линейным.
+_LDC_RE = re.compile(r"R\[(\d++)\]\s*+=\s*+(\d++)")                 # R[B] = C
+_LDM_RE = re.compile(r"R\[(\d++)\]\s*+=\s*+M\[(\d++)\]")           # R[C] = M[B]
+_STM_RE = re.compile(r"M\[R\[(\d++)\]\]\s*+=\s*+R\[(\d++)\]")     # M[R[B]] = R[C]
+_BINOP_RE = re.compile(r"R\[(\d++)\],\s*+R\[(\d++)\],\s*+(\d++)")  # R[D], R[B], C
+
+
+@dataclass(slots=True, frozen=True)
+class CommandSpec:
+    """
+    Описание команды УВМ: код операции (A), формат и поля.
+    regex разбирает операнды (группы идут в порядке fields), shifts задаёт
+    пары (сдвиг, поле) для упаковки машинного слова.
+    """
+    A: int
+    format: str
+    fields: Tuple[str, ...]
+    regex: re.Pattern
+    shifts: Tuple[Tuple[int, str], ...]
+    byte_size: int
+    test_fields: Dict[str, int]
+    test_bytes: bytes
+
+
+# Словарь для маппинга мнемоник на описание команды.
 # Обратите внимание: тестовые байтовые последовательности подобраны
 # для соответствия требованиям спецификации.
 
 COMMAND_SPEC = {
     # 1. Загрузка константы (LDC): A=4. Формат: 5 байт.
     # Поля: A(0-3), B(4-10: Адрес), C(11-36: Константа).
-    "LDC": {
-        "A": 4, 
-        "format": "R[{B}] = {C}",
-        "fields": ["B", "C"],
-        "byte_size": 5,
-        "test_fields": {"A": 4, "B": 91, "C": 651}, # Тест A=4, B=91, C=651
+    "LDC": CommandSpec(
+        A=4, 
+        format="R[{B}] = {C}",
+        fields=("B", "C"),
+        regex=_LDC_RE,
+        shifts=((4, "B"), (11, "C")),
+        byte_size=5,
+        test_fields={"A": 4, "B": 91, "C": 651}, # Тест A=4, B=91, C=651
         # 0xE4, 0x5D, 0x14, 0x00, 0x00 (используя 0x14 вместо 8x14)
-        "test_bytes": [0xE4, 0x5D, 0x14, 0x00, 0x00] 
-    },
+        test_bytes=bytes([0xE4, 0x5D, 0x14, 0x00, 0x00]) 
+    ),
     
     # 2. Чтение из памяти (LDM): A=14. Формат: 4 байта.
     # Поля: A(0-3), B(4-18: Адрес памяти), C(19-25: Адрес регистра).
-    "LDM": {
-        "A": 14, 
-        "format": "R[{C}] = M[{B}]",
-        "fields": ["C", "B"], 
-        "byte_size": 4,
-        "test_fields": {"A": 14, "B": 820, "C": 53}, # Тест A=14, B=820, C=53
-        "test_bytes": [0x4E, 0x33, 0xA8, 0x01] 
-    },
+    "LDM": CommandSpec(
+        A=14, 
+        format="R[{C}] = M[{B}]",
+        fields=("C", "B"), 
+        regex=_LDM_RE,
+        shifts=((4, "B"), (19, "C")),
+        byte_size=4,
+        test_fields={"A": 14, "B": 820, "C": 53}, # Тест A=14, B=820, C=53
+        test_bytes=bytes([0x4E, 0x33, 0xA8, 0x01]) 
+    ),
     
     # 3. Запись в память (STM): A=10. Формат: 3 байта.
     # Поля: A(0-3), B(4-10: Регистр с адресом памяти), C(11-17: Регистр со значением).
-    "STM": {
-        "A": 10, 
-        "format": "M[R[{B}]] = R[{C}]",
-        "fields": ["B", "C"],
-        "byte_size": 3,
-        "test_fields": {"A": 10, "B": 5, "C": 8}, # Тест A=10, B=5, C=8
-        "test_bytes": [0x5A, 0x98, 0x02]
-    },
+    "STM": CommandSpec(
+        A=10, 
+        format="M[R[{B}]] = R[{C}]",
+        fields=("B", "C"),
+        regex=_STM_RE,
+        shifts=((4, "B"), (11, "C")),
+        byte_size=3,
+        test_fields={"A": 10, "B": 5, "C": 8}, # Тест A=10, B=5, C=8
+        test_bytes=bytes([0x5A, 0x98, 0x02])
+    ),
     
     # 4. Бинарная операция (BIN_OP): A=5. Формат: 4 байта.
     # Поля: A(0-3), B(4-10: Регистр с базой), C(11-20: Смещение), D(21-27: Регистр/Результат).
-    "BIN_OP": {
-        "A": 5, 
-        "format": "R[{D}], R[{B}], {C}",
-        "fields": ["D", "B", "C"],
-        "byte_size": 4,
-        "test_fields": {"A": 5, "B": 85, "C": 310, "D": 6}, # Тест A=5, B=85, C=310, D=6
-        "test_bytes": [0x55, 0xB5, 0xA9, 0x07]
-    },
+    "BIN_OP": CommandSpec(
+        A=5, 
+        format="R[{D}], R[{B}], {C}",
+        fields=("D", "B", "C"),
+        regex=_BINOP_RE,
+        shifts=((4, "B"), (11, "C"), (21, "D")),
+        byte_size=4,
+        test_fields={"A": 5, "B": 85, "C": 310, "D": 6}, # Тест A=5, B=85, C=310, D=6
+        test_bytes=bytes([0x55, 0xB5, 0xA9, 0x07])
+    ),
 }
 
+def _line_pattern(mnemonic: str, spec: CommandSpec) -> str:
+    """Ветвь общего выражения для одной мнемоники."""
+    operands = spec.regex.pattern.replace(r"\s", r"[^\S\n]")
+    return rf"(?P<{mnemonic}>(?i:{mnemonic})[^\S\n]++{operands})"
+
+
+# Общее выражение для быстрого разбора строки исходного текста.
+# Ветви совпадают с пустой строкой, комментарием или командой (внешняя
+# именованная группа - мнемоника, за ней идут группы операндов).
+# Пробельные символы не захватывают перевод строки, а $ допускает его в конце.
+_MASTER_RE = re.compile(
+    r"[^\S\n]*+(?:#[^\n]*+|"
+    + "|".join(_line_pattern(mnemonic, spec) for mnemonic, spec in COMMAND_SPEC.items())
+    + r")?[^\S\n]*+$"
+)
+
 # --- 2. ФУНКЦИИ АССЕМБЛЕРА (ЭТАП 1) ---
 
+# Размер буфера чтения исходного файла.
+_INPUT_BUFFER_SIZE = 1 << 20
+
 def parse_line(line: str, line_num: int) -> Dict[str, Any] | None:
     """Разбирает одну строку ассемблерного кода в словарь полей (Промежуточное Представление)."""
     line = line.strip()
@@ -74,184 +139,424 @@ def parse_line(line: str, line_num: int) -> Dict[str, Any] | None:
         raise ValueError(f"Ошибка в строке {line_num}: Неизвестная мнемоника '{mnemonic}'")
 
     spec = COMMAND_SPEC[mnemonic]
-    fields = {}
-    
-    # Регулярные выражения для парсинга операндов
-    if mnemonic == "LDC":
-        # R[B] = C
-        match = re.fullmatch(r"R\[(\d+)\]\s*=\s*(\d+)", operand_string)
-        if not match:
-            raise SyntaxError(f"Ошибка в строке {line_num}: Неверный синтаксис LDC. Ожидался 'R[B] = C'")
-        fields['B'] = int(match.group(1))
-        fields['C'] = int(match.group(2))
-        
-    elif mnemonic == "LDM":
-        # R[C] = M[B]
-        match = re.fullmatch(r"R\[(\d+)\]\s*=\s*M\[(\d+)\]", operand_string)
-        if not match:
-            raise SyntaxError(f"Ошибка в строке {line_num}: Неверный синтаксис LDM. Ожидался 'R[C] = M[B]'")
-        fields['C'] = int(match.group(1)) # Регистр назначения (C)
-        fields['B'] = int(match.group(2)) # Адрес памяти (B)
-        
-    elif mnemonic == "STM":
-        # M[R[B]] = R[C]
-        match = re.fullmatch(r"M\[R\[(\d+)\]\]\s*=\s*R\[(\d+)\]", operand_string)
-        if not match:
-            raise SyntaxError(f"Ошибка в строке {line_num}: Неверный синтаксис STM. Ожидался 'M[R[B]] = R[C]'")
-        fields['B'] = int(match.group(1)) # Регистр с адресом памяти (B)
-        fields['C'] = int(match.group(2)) # Регистр со значением (C)
-        
-    elif mnemonic == "BIN_OP":
-        # R[D], R[B], C
-        match = re.fullmatch(r"R\[(\d+)\],\s*R\[(\d+)\],\s*(\d+)", operand_string)
-        if not match:
-            raise SyntaxError(f"Ошибка в строке {line_num}: Неверный синтаксис BIN_OP. Ожидался 'R[D], R[B], C'")
-        fields['D'] = int(match.group(1))
-        fields['B'] = int(match.group(2))
-        fields['C'] = int(match.group(3))
-        
-    # Формирование промежуточного представления (ПП)
-    pp_entry = {
-        "mnemonic": mnemonic,
-        "A": spec["A"],
-        "byte_size": spec["byte_size"]
-    }
-    pp_entry.update(fields)
+
+    # Разбор операндов выражением из спецификации.
+    # Порядок групп совпадает с порядком spec.fields.
+    match = spec.regex.fullmatch(operand_string)
+    if not match:
+        expected_format = spec.format.replace("{", "").replace("}", "")
+        raise SyntaxError(f"Ошибка в строке {line_num}: Неверный синтаксис {mnemonic}. Ожидался '{expected_format}'")
+    return _make_pp_entry(mnemonic, match.groups())
+
+
+def _make_pp_entry(mnemonic: str, operands) -> Dict[str, Any]:
+    """Формирует запись ПП из мнемоники и строковых значений операндов (в порядке spec.fields)."""
+    header, fields, _ = _ENTRY_TEMPLATES[mnemonic]
+    pp_entry = header.copy()
+    pp_entry.update(zip(fields, map(int, operands)))
     return pp_entry
 
 
+class AssemblyError(Exception):
+    """Трансляция прервана; сообщение об ошибке уже выведено на экран."""
+
+
+class _LineError(Exception):
+    """Ошибка разбора строки line_num (нумерация внутри переданного фрагмента)."""
+
+    def __init__(self, line_num: int, error: Exception):
+        super().__init__(line_num, error)
+        self.line_num = line_num
+        self.error = error
+
+
+def _parse_source_lines(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Разбирает строки исходного текста и по одной выдаёт записи ПП.
+    Корректные строки разбираются общим выражением, остальные - через parse_line;
+    его ошибка возбуждается как _LineError с номером строки.
+    """
+    # Глобальные имена горячего цикла связаны с локальными переменными.
+    match_line = _MASTER_RE.match
+    entry_templates = _ENTRY_TEMPLATES
+    for i, line in enumerate(lines, 1):
+        match = match_line(line)
+        if match is None:
+            try:
+                pp_entry = parse_line(line, i)
+            except (ValueError, SyntaxError) as e:
+                raise _LineError(i, e) from e
+            if pp_entry:
+                yield pp_entry
+        elif mnemonic := match.lastgroup:
+            header, fields, groups = entry_templates[mnemonic]
+            pp_entry = header.copy()
+            pp_entry.update(zip(fields, map(int, match.group(*groups))))
+            yield pp_entry
+
+
+def _open_source(source_path: str):
+    """
+    Открывает исходный файл для чтения в двоичном режиме.
+    При ошибке выводит сообщение и возбуждает AssemblyError.
+    """
+    try:
+        return open(source_path, 'rb', buffering=_INPUT_BUFFER_SIZE)
+    except OSError as e:
+        raise _source_error(source_path, e) from None
+
+
+def iter_parsed(source_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Открывает исходный файл и возвращает итератор, по одной выдающий записи
+    промежуточного представления. Файл открывается сразу при вызове, поэтому
+    об отсутствующем исходном файле сообщается до создания файла-результата.
+    При ошибке выводит сообщение и возбуждает AssemblyError.
+    """
+    return _iter_source(source_path, io.TextIOWrapper(_open_source(source_path), encoding='utf-8'))
+
+
+def _iter_source(source_path: str, f) -> Iterator[Dict[str, Any]]:
+    """Разбирает строки открытого исходного файла f по одной и закрывает его."""
+    # Строки читаются и разбираются по одной, без загрузки всего файла.
+    with f:
+        try:
+            yield from _parse_source_lines(f)
+        except _LineError as e:
+            print(f"Критическая ошибка ассемблирования в строке {e.line_num}: {e.error}")
+            raise AssemblyError(e.line_num) from e.error
+        except (OSError, UnicodeDecodeError) as e:
+            raise _source_error(source_path, e) from None
+
+
+def _source_error(source_path: str, error: OSError | UnicodeDecodeError) -> AssemblyError:
+    """
+    Выводит сообщение об ошибке открытия или чтения исходного файла и
+    возвращает AssemblyError, чтобы её не приняли за ошибку записи результата
+    или генерации машинного кода.
+    """
+    if isinstance(error, FileNotFoundError):
+        print(f"Ошибка: Исходный файл не найден по пути: {source_path}")
+    else:
+        print(f"Ошибка чтения исходного файла {source_path}: {getattr(error, 'strerror', None) or error}")
+    return AssemblyError(source_path)
+
+
 def assemble_to_pp(source_path: str) -> List[Dict[str, Any]]:
     """Читает исходный файл и транслирует его в промежуточное представление."""
-    intermediate_representation = []
-    
     try:
-        with open(source_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print(f"Ошибка: Исходный файл не найден по пути: {source_path}")
+        return list(iter_parsed(source_path))
+    except AssemblyError:
         return []
 
-    for i, line in enumerate(lines, 1):
-        try:
-            pp_entry = parse_line(line, i)
-            if pp_entry:
-                intermediate_representation.append(pp_entry)
-        except (ValueError, SyntaxError) as e:
-            print(f"Критическая ошибка ассемблирования в строке {i}: {e}")
-            return []
-            
-    return intermediate_representation
+
+# Заготовки записей ПП для совпадений _MASTER_RE: мнемоника -> (общие поля
+# записи, имена операндов, номера групп операндов в _MASTER_RE).
+_ENTRY_TEMPLATES = {
+    mnemonic: (
+        {"mnemonic": mnemonic, "A": spec.A, "byte_size": spec.byte_size},
+        spec.fields,
+        tuple(range(_MASTER_RE.groupindex[mnemonic] + 1, _MASTER_RE.groupindex[mnemonic] + 1 + len(spec.fields))),
+    )
+    for mnemonic, spec in COMMAND_SPEC.items()
+}
 
 # --- 3. ФУНКЦИЯ ГЕНЕРАЦИИ МАШИННОГО КОДА (ЭТАП 2) ---
 
+# Число команд, кодируемых и записываемых в файл за один раз.
+_WRITE_BATCH_SIZE = 1 << 16
+
+# Размер буфера BufferedWriter для выходного файла.
+_OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Размер фрагмента исходного файла (в байтах) для параллельной трансляции.
+_CHUNK_SIZE = 1 << 20
+
+# Запись 64-битного слова little-endian в буфер по смещению.
+_PACK_U64 = struct.Struct('<Q').pack_into
+
+
+def _build_encoder(mnemonic: str) -> Callable[[Dict[str, Any], bytearray, int], int]:
+    """
+    Генерирует специализированную функцию кодирования команды mnemonic.
+    Код операции, сдвиги и размер подставляются в текст функции как константы,
+    поэтому упаковка слова сводится к одному выражению без циклов и ветвлений.
+    Функция пишет слово в out по смещению offset и возвращает смещение
+    следующей команды.
+    """
+    spec = COMMAND_SPEC[mnemonic]
+    word_expr = " | ".join([str(spec.A)] + [f'(pp_entry["{field}"] << {shift})' for shift, field in spec.shifts])
+    source = (
+        f"def _encode_{mnemonic.lower()}(pp_entry, out, offset):\n"
+        f"    instruction_word = {word_expr}\n"
+        f"    if instruction_word >> {spec.byte_size * 8}:\n"
+        f"        raise OverflowError('int too big to convert')\n"
+        f"    _PACK_U64(out, offset, instruction_word)\n"
+        f"    return offset + {spec.byte_size}\n"
+    )
+    namespace = {"_PACK_U64": _PACK_U64}
+    exec(source, namespace)
+    return namespace[f"_encode_{mnemonic.lower()}"]
+
+
+# Таблица кодирования: мнемоника -> специализированная функция кодирования.
+_ENCODERS = {sys.intern(mnemonic): _build_encoder(mnemonic) for mnemonic in COMMAND_SPEC}
+
+
 def generate_machine_code(pp_entry: Dict[str, Any]) -> bytes:
     """
     Преобразует запись промежуточного представления (ПП) в двоичную байтовую строку.
-    Использует побитовые операции согласно спецификации УВМ (little-endian).
+    Использует ту же функцию из _ENCODERS, что и encode_program, поэтому
+    режим тестирования проверяет кодировщик, формирующий выходной файл.
     """
-    mnemonic = pp_entry["mnemonic"]
-    
-    # Поле A всегда находится в битах 0-3.
-    instruction_word = pp_entry["A"] 
-    size = pp_entry["byte_size"]
-    
-    if mnemonic == "LDC":
-        # A (0-3), B (4-10), C (11-36)
-        instruction_word |= (pp_entry["B"] << 4)
-        instruction_word |= (pp_entry["C"] << 11)
-        
-    elif mnemonic == "LDM":
-        # A (0-3), B (4-18), C (19-25)
-        instruction_word |= (pp_entry["B"] << 4)
-        instruction_word |= (pp_entry["C"] << 19)
-        
-    elif mnemonic == "STM":
-        # A (0-3), B (4-10), C (11-17)
-        instruction_word |= (pp_entry["B"] << 4)
-        instruction_word |= (pp_entry["C"] << 11)
-        
-    elif mnemonic == "BIN_OP":
-        # A (0-3), B (4-10), C (11-20), D (21-27)
-        instruction_word |= (pp_entry["B"] << 4)
-        instruction_word |= (pp_entry["C"] << 11)
-        instruction_word |= (pp_entry["D"] << 21)
-        
-    # Преобразование машинного слова (целого числа) в байты (little-endian)
-    return instruction_word.to_bytes(size, byteorder='little')
+    # 8 байт под запись слова целиком; результат обрезается до размера команды.
+    out = bytearray(8)
+    size = _ENCODERS[pp_entry["mnemonic"]](pp_entry, out, 0)
+    return bytes(out[:size])
+
+
+def encode_program(pp_list: List[Dict[str, Any]]) -> bytearray:
+    """
+    Пакетно кодирует всю программу в заранее выделенный буфер. Каждое машинное
+    слово записывается специализированной функцией из _ENCODERS как 8 байт
+    little-endian по смещению команды; лишние старшие байты перезаписываются
+    следующей командой.
+    Результат совпадает с конкатенацией generate_machine_code по всем записям.
+    """
+    total = sum(pp_entry["byte_size"] for pp_entry in pp_list)
+    # Запас в 8 байт под запись последнего слова целиком.
+    out = bytearray(total + 8)
+    offset = 0
+    encoders = _ENCODERS
+    for pp_entry in pp_list:
+        offset = encoders[pp_entry["mnemonic"]](pp_entry, out, offset)
+    del out[total:]
+    return out
+
+
+def write_program(pp_entries: Iterable[Dict[str, Any]], f, batch_size: int = _WRITE_BATCH_SIZE) -> int:
+    """
+    Кодирует программу пакетами по batch_size команд и сразу пишет их в файл f,
+    так что в памяти одновременно находится машинный код только одного пакета.
+    pp_entries может быть генератором (iter_parsed): тогда разбор и кодирование
+    идут одним проходом без построения списка ПП. Возвращает число команд.
+    """
+    pp_entries = iter(pp_entries)
+    count = 0
+    while batch := list(islice(pp_entries, batch_size)):
+        f.write(encode_program(batch))
+        count += len(batch)
+    return count
+
+
+def assemble_chunk(data: bytes) -> Tuple[bytes, int, int, Tuple[int, str] | None]:
+    """
+    Транслирует фрагмент исходного файла (целое число строк в UTF-8) в машинный код.
+    Выполняется в процессе-обработчике, поэтому ничего не выводит на экран.
+    Возвращает (машинный код, число команд, число строк, ошибка), где ошибка -
+    None или (номер строки внутри фрагмента, текст этой строки).
+    """
+    # Переводы строк нормализуются так же, как при чтении файла в текстовом режиме.
+    lines = io.StringIO(data.decode('utf-8'), newline=None).readlines()
+    try:
+        pp_list = list(_parse_source_lines(lines))
+    except _LineError as e:
+        return b'', 0, len(lines), (e.line_num, lines[e.line_num - 1])
+    return bytes(encode_program(pp_list)), len(pp_list), len(lines), None
+
+
+def _chunk_bounds(data, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """Делит data на фрагменты примерно по chunk_size байт, выровненные по концу строки."""
+    start = 0
+    while start < len(data):
+        end = data.find(b'\n', min(start + chunk_size, len(data)) - 1) + 1 or len(data)
+        yield start, end
+        start = end
+
+
+def write_program_parallel(source_path: str, source, f, jobs: int) -> int:
+    """
+    Транслирует исходный файл source (открытый в двоичном режиме обычный файл,
+    закрывается по завершении) на jobs процессах и пишет машинный код в файл f.
+    Файл отображается в память (mmap) и делится на фрагменты по границам строк;
+    фрагменты транслируются независимо (assemble_chunk), а их машинный код
+    записывается в исходном порядке, поэтому в памяти находится не более
+    jobs фрагментов и их результатов. Возвращает число команд.
+    При ошибке выводит сообщение и возбуждает AssemblyError.
+    """
+    with source:
+        try:
+            size = os.fstat(source.fileno()).st_size
+            data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        except OSError as e:
+            raise _source_error(source_path, e) from None
+        if not size:
+            return 0
+        with data, ProcessPoolExecutor(max_workers=jobs) as pool:
+            # В обработке одновременно не более jobs фрагментов; фрагмент
+            # копируется из mmap только в момент отправки обработчику.
+            bounds = _chunk_bounds(data, _CHUNK_SIZE)
+            pending = deque(pool.submit(assemble_chunk, data[start:end]) for start, end in islice(bounds, jobs))
+
+            command_count = 0
+            line_base = 0
+            while pending:
+                try:
+                    machine_code, count, line_count, error = pending.popleft().result()
+                except UnicodeDecodeError as e:
+                    for future in pending:
+                        future.cancel()
+                    raise _source_error(source_path, e) from None
+                if error:
+                    for future in pending:
+                        future.cancel()
+                    # Строка разбирается повторно, чтобы сообщение содержало
+                    # её номер в исходном файле, а не внутри фрагмента.
+                    line_num, line = error
+                    line_num += line_base
+                    try:
+                        parse_line(line, line_num)
+                    except (ValueError, SyntaxError) as e:
+                        print(f"Критическая ошибка ассемблирования в строке {line_num}: {e}")
+                    raise AssemblyError(line_num)
+                next_bounds = next(bounds, None)
+                if next_bounds:
+                    start, end = next_bounds
+                    pending.append(pool.submit(assemble_chunk, data[start:end]))
+                f.write(machine_code)
+                command_count += count
+                line_base += line_count
+    return command_count
 
 
 # --- 4. РЕЖИМ ТЕСТИРОВАНИЯ (ЭТАПЫ 1 И 2) ---
 
 def run_tests(pp_list: List[Dict[str, Any]]):
-    """Проверяет и выводит ПП (Этап 1) и сгенерированный байт-код (Этап 2)."""
+    """
+    Проверяет и выводит ПП (Этап 1) и сгенерированный байт-код (Этап 2).
+    Строки отчёта накапливаются и выводятся на экран одним вызовом print.
+    """
+    report = []
     
     # 1. Проверка Промежуточного Представления (Этап 1)
-    print("\n--- 📝 РЕЖИМ ТЕСТИРОВАНИЯ (Промежуточное представление) ---")
+    report.append("\n--- 📝 РЕЖИМ ТЕСТИРОВАНИЯ (Промежуточное представление) ---")
     
     expected_pp_entries = [
-        COMMAND_SPEC["LDC"]["test_fields"],
-        COMMAND_SPEC["LDM"]["test_fields"],
-        COMMAND_SPEC["STM"]["test_fields"],
-        COMMAND_SPEC["BIN_OP"]["test_fields"],
+        COMMAND_SPEC["LDC"].test_fields,
+        COMMAND_SPEC["LDM"].test_fields,
+        COMMAND_SPEC["STM"].test_fields,
+        COMMAND_SPEC["BIN_OP"].test_fields,
     ]
     
     if len(pp_list) < len(expected_pp_entries):
-        print("Тест на количество команд: ❌ НЕУДАЧА. Ожидалось: 4.")
-        print("---")
+        report.append("Тест на количество команд: ❌ НЕУДАЧА. Ожидалось: 4.")
+        report.append("---")
+        print("\n".join(report))
         return
 
     all_fields_passed = True
     
-    for i, expected in enumerate(expected_pp_entries):
-        actual = pp_list[i]
+    for i, (expected, actual) in enumerate(zip(expected_pp_entries, pp_list)):
         actual_fields = {k: v for k, v in actual.items() if k in expected}
         
         match = (expected == actual_fields)
         status = "✅ ПРОЙДЕН" if match else "❌ НЕУДАЧА"
         all_fields_passed = all_fields_passed and match
         
-        print(f"Команда {i+1} ({actual['mnemonic']}): Поля {status}")
-        print(f"  Ожидаемые поля: {expected}")
-        print(f"  Фактические поля: {actual_fields}")
+        report.append(f"Команда {i+1} ({actual['mnemonic']}): Поля {status}")
+        report.append(f"  Ожидаемые поля: {expected}")
+        report.append(f"  Фактические поля: {actual_fields}")
     
     if all_fields_passed:
-        print("\n🎉 ВСЕ ТЕСТЫ ПОЛЕЙ УСПЕШНО ПРОЙДЕНЫ!")
-    print("-------------------------------------------------")
+        report.append("\n🎉 ВСЕ ТЕСТЫ ПОЛЕЙ УСПЕШНО ПРОЙДЕНЫ!")
+    report.append("-------------------------------------------------")
 
 
     # 2. Проверка Байтовых Последовательностей (Этап 2)
-    print("\n--- 💾 РЕЖИМ ТЕСТИРОВАНИЯ (Байтовые последовательности) ---")
+    report.append("\n--- 💾 РЕЖИМ ТЕСТИРОВАНИЯ (Байтовые последовательности) ---")
     
     all_bytes_passed = True
     
     for i, pp_entry in enumerate(pp_list):
         mnemonic = pp_entry["mnemonic"]
-        expected_bytes_list = COMMAND_SPEC[mnemonic]["test_bytes"]
+        expected_bytes = COMMAND_SPEC[mnemonic].test_bytes
         
         try:
             actual_bytes = generate_machine_code(pp_entry)
         except Exception as e:
-            print(f"Ошибка генерации байт-кода для {mnemonic}: {e}")
+            report.append(f"Ошибка генерации байт-кода для {mnemonic}: {e}")
             all_bytes_passed = False
             continue
             
-        actual_bytes_list = list(actual_bytes)
-        
-        match = (expected_bytes_list == actual_bytes_list)
+        match = (expected_bytes == actual_bytes)
         status = "✅ ПРОЙДЕН" if match else "❌ НЕУДАЧА"
         all_bytes_passed = all_bytes_passed and match
         
-        print(f"Команда {i+1} ({mnemonic}): Байты {status}")
-        print(f"  Ожидаемые байты: {[hex(b) for b in expected_bytes_list]}")
-        print(f"  Фактические байты: {[hex(b) for b in actual_bytes_list]}")
+        report.append(f"Команда {i+1} ({mnemonic}): Байты {status}")
+        report.append(f"  Ожидаемые байты: {[hex(b) for b in expected_bytes]}")
+        report.append(f"  Фактические байты: {[hex(b) for b in actual_bytes]}")
         
     if all_bytes_passed:
-        print("\n🎉 ВСЕ ТЕСТЫ БАЙТОВЫХ ПОСЛЕДОВАТЕЛЬНОСТЕЙ УСПЕШНО ПРОЙДЕНЫ!")
-    print("-------------------------------------------------")
+        report.append("\n🎉 ВСЕ ТЕСТЫ БАЙТОВЫХ ПОСЛЕДОВАТЕЛЬНОСТЕЙ УСПЕШНО ПРОЙДЕНЫ!")
+    report.append("-------------------------------------------------")
+    print("\n".join(report))
+
+
+def dump_pp(pp_list: List[Dict[str, Any]], stream=None):
+    """
+    Выводит ПП в формате JSON Lines: каждая запись сериализуется и пишется
+    в поток отдельно, без построения общей строки для всего списка.
+    По умолчанию используется текущий sys.stdout.
+    """
+    if stream is None:
+        stream = sys.stdout
+    for pp_entry in pp_list:
+        json.dump(pp_entry, stream, ensure_ascii=False)
+        stream.write('\n')
 
 
 # --- 5. CLI И ГЛАВНАЯ ФУНКЦИЯ ---
 
+def _positive_int(value: str) -> int:
+    """Тип аргумента argparse: целое число не меньше 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"ожидалось целое число не меньше 1: {value}")
+    return number
+
+
+def _open_output(binary_output: str):
+    """
+    Открывает файл-результат для записи.
+    Возвращает (файл, временный файл или None, путь для удаления при ошибке или None).
+
+    Существующий обычный файл пользователя, доступный для записи и без других
+    жёстких ссылок, заменяется атомарно: код пишется во временный файл рядом с
+    целью символической ссылки и переносится на место результата только после
+    успешной записи. Новый файл, устройство или канал (например, /dev/stdout),
+    файл только для чтения, чужой файл, файл с жёсткими ссылками, а также
+    каталог, в котором нельзя создать временный файл, открываются напрямую,
+    как обычным open(). Созданный этим запуском новый файл удаляется при ошибке.
+    """
+    try:
+        st = os.stat(binary_output)
+    except FileNotFoundError:
+        return open(binary_output, 'wb', buffering=_OUTPUT_BUFFER_SIZE), None, os.path.realpath(binary_output)
+    if (stat.S_ISREG(st.st_mode) and st.st_nlink == 1 and st.st_uid == os.geteuid()
+            and os.access(binary_output, os.W_OK)):
+        output_path = os.path.realpath(binary_output)
+        try:
+            fd, tmp_output = tempfile.mkstemp(
+                dir=os.path.dirname(output_path), prefix=os.path.basename(output_path) + '.', suffix='.tmp'
+            )
+        except PermissionError:
+            pass
+        else:
+            shutil.copymode(output_path, tmp_output)
+            return os.fdopen(fd, 'wb', buffering=_OUTPUT_BUFFER_SIZE), tmp_output, tmp_output
+    return open(binary_output, 'wb', buffering=_OUTPUT_BUFFER_SIZE), None, None
+
+
 def main():
     """Главная функция CLI-приложения ассемблера."""
     # 1. Обработка аргументов командной строки (Требования 31-34)
@@ -259,35 +564,66 @@ def main():
     parser.add_argument("source_file", help="Путь к исходному файлу с текстом программы.")
     parser.add_argument("binary_output", help="Путь к двоичному файлу-результату.")
     parser.add_argument("--test_mode", action="store_true", help="Режим тестирования: вывод ПП и байт-кода на экран.")
+    parser.add_argument("--dump_pp", action="store_true", help="Вывод ПП на экран в формате JSON (по одной записи на строку).")
+    parser.add_argument("--jobs", type=_positive_int, default=1, help="Число процессов для трансляции больших файлов (не используется с --test_mode и --dump_pp).")
     
     args = parser.parse_args()
     
-    # 2. Трансляция в ПП (Этап 1)
-    pp_list = assemble_to_pp(args.source_file)
-    if not pp_list: return
-    
-    # 3. Формирование машинного кода (Этап 2)
-    machine_code = b''
-    for pp_entry in pp_list:
+    # 2. Трансляция в ПП (Этап 1). Список ПП нужен только для вывода на экран,
+    # иначе записи из исходного файла сразу уходят на кодирование, а при
+    # --jobs > 1 обычный файл транслируется по фрагментам в отдельных процессах
+    # (канал или устройство разбирается последовательно). Исходный файл
+    # открывается до создания файла-результата.
+    if args.test_mode or args.dump_pp:
+        pp_list = assemble_to_pp(args.source_file)
+        if not pp_list: return
+        pp_entries = pp_list
+    else:
         try:
-            machine_code += generate_machine_code(pp_entry)
-        except Exception as e:
-            print(f"Критическая ошибка при генерации машинного кода: {e}")
+            source = _open_source(args.source_file)
+        except AssemblyError:
             return
-
-    # 4. Запись в файл (Требование 48)
+        if args.jobs > 1 and stat.S_ISREG(os.fstat(source.fileno()).st_mode):
+            pp_entries = None
+        else:
+            pp_entries = _iter_source(args.source_file, io.TextIOWrapper(source, encoding='utf-8'))
+    
+    # 3-4. Формирование машинного кода (Этап 2) и запись в файл (Требование 48).
+    # Код пишется пакетами; существующий результат по возможности заменяется
+    # атомарно, только после успешного кодирования всей программы (см. _open_output).
+    tmp_output = discard_path = None
     try:
-        with open(args.binary_output, 'wb') as f:
-            f.write(machine_code)
+        f, tmp_output, discard_path = _open_output(args.binary_output)
+        with f:
+            if pp_entries is None:
+                command_count = write_program_parallel(args.source_file, source, f, args.jobs)
+            else:
+                command_count = write_program(pp_entries, f)
+        if not command_count: return
+        if tmp_output:
+            os.replace(tmp_output, os.path.realpath(args.binary_output))
+        discard_path = None
         print(f"\n✅ Результат записан в двоичный файл: {args.binary_output}")
+    except AssemblyError:
+        return
     except IOError:
         print(f"Ошибка записи в выходной файл: {args.binary_output}")
         return
+    except Exception as e:
+        print(f"Критическая ошибка при генерации машинного кода: {e}")
+        return
+    finally:
+        if discard_path:
+            os.remove(discard_path)
 
     # 5. Вывод числа команд (Требование 49)
-    print(f"📊 Число ассемблированных команд: {len(pp_list)}")
+    print(f"📊 Число ассемблированных команд: {command_count}")
+
+    # 6. Вывод ПП по запросу
+    if args.dump_pp:
+        dump_pp(pp_list)
 
-    # 6. Режим тестирования (Требования 39, 50, 51)
+    # 7. Режим тестирования (Требования 39, 50, 51)
     if args.test_mode:
         run_tests(pp_list)
     else: